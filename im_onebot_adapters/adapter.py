@@ -1,6 +1,8 @@
 from ast import List
 import asyncio
 import functools
+import hashlib
+import os
 import random
 import time
 from typing import Dict, Optional
@@ -21,6 +23,8 @@ from kirara_ai.workflow.core.dispatch.dispatcher import WorkflowDispatcher
 from .config import OneBotConfig
 from .handlers.message_result import MessageResult
 from .utils.message import create_message_element
+from .utils.recorder import TrafficRecorder
+from .utils.snapshot import CacheSnapshot, load_snapshot, save_snapshot
 
 
 class OneBotAdapter(IMAdapter, UserProfileAdapter, BotProfileAdapter):
@@ -47,11 +51,74 @@ class OneBotAdapter(IMAdapter, UserProfileAdapter, BotProfileAdapter):
         self.bot.on_notice(self.handle_notice)  # 通知处理器
         self.bot.on_message(self._handle_msg)  # 消息处理器
 
+        # 流量录制，在所有事件处理器之前记录原始事件
+        self._recorder: Optional[TrafficRecorder] = None
+        if self.config.record_path:
+            self._recorder = TrafficRecorder(
+                self.config.record_path, self.logger, redact=self.config.record_redact)
+            self.bot.before('message', 'notice', 'request', 'meta_event')(
+                self._recorder.record_event)
+            self.bot.call_action = self._recorder.wrap_call_action(  # type: ignore
+                self.bot.call_action)
+
         # 添加用户资料缓存,TTL为1小时
         self._profile_cache: Dict[str, UserProfile] = {}  # 用户资料缓存
         self._profile_cache_time: Dict[str, float] = {}  # 缓存时间记录
         self._cache_ttl = 3600  # 缓存过期时间(秒)
 
+    @property
+    def _snapshot_path(self) -> Optional[str]:
+        """缓存快照文件路径，按连接地址区分不同的适配器实例"""
+        if not self.config.snapshot_dir:
+            return None
+        if self.config.host and self.config.port:
+            endpoint = f"{self.config.host}:{self.config.port}"
+        else:
+            endpoint = self.config.websocket_url
+        digest = hashlib.sha1(endpoint.encode()).hexdigest()[:8]
+        return os.path.join(self.config.snapshot_dir, f"cache_{digest}.db")
+
+    async def _restore_snapshot(self):
+        """从快照恢复缓存，已有的条目优先于快照中的旧条目"""
+        path = self._snapshot_path
+        if not path:
+            return
+        snapshot = await asyncio.to_thread(
+            load_snapshot, path, self._cache_ttl, self.logger)
+        if snapshot is None:
+            return
+
+        for key, (profile, cached_at) in snapshot.profiles.items():
+            if key not in self._profile_cache:
+                self._profile_cache[key] = profile
+                self._profile_cache_time[key] = cached_at
+        if self.self_id is None:
+            self.self_id = snapshot.self_id
+
+        self.logger.info(
+            f"Restored {len(snapshot.profiles)} cached profiles from {path}")
+
+    async def _save_snapshot(self):
+        """将未过期的缓存写入快照"""
+        path = self._snapshot_path
+        if not path:
+            return
+        current_time = time.time()
+        snapshot = CacheSnapshot(
+            self_id=self.self_id,
+            profiles={
+                key: (profile, self._profile_cache_time[key])
+                for key, profile in self._profile_cache.items()
+                if current_time - self._profile_cache_time.get(key, 0) < self._cache_ttl
+            }
+        )
+        try:
+            await asyncio.to_thread(save_snapshot, path, snapshot)
+            self.logger.info(
+                f"Saved {len(snapshot.profiles)} cached profiles to {path}")
+        except Exception as e:
+            self.logger.warning(f"Failed to save cache snapshot {path}: {e}")
+
     async def _check_heartbeats(self):
         """
         检查所有连接的心跳状态
@@ -119,12 +186,13 @@ class OneBotAdapter(IMAdapter, UserProfileAdapter, BotProfileAdapter):
         message_elements = []
         for msg in event.message:
             try:
-                if msg['type'] == 'at':
-                    if str(msg['data']['qq']) == str(event.self_id):
-                        msg['data']['is_bot'] = True  # 标记这是at机器人的消息
+                data = msg['data']
+                if msg['type'] == 'at' and str(data['qq']) == str(event.self_id):
+                    # 标记这是at机器人的消息，复制一份以免修改原始事件
+                    data = {**data, 'is_bot': True}
 
                 element = create_message_element(
-                    msg['type'], msg['data'], self.logger)
+                    msg['type'], data, self.logger)
                 if element:
                     message_elements.append(element)
             except Exception as e:
@@ -217,6 +285,8 @@ class OneBotAdapter(IMAdapter, UserProfileAdapter, BotProfileAdapter):
     async def start(self):
         """启动适配器"""
         try:
+            await self._restore_snapshot()
+
             if self.config.host and self.config.port:
                 self.logger.warning("正在使用过时的启动模式，请尽快更新为 Websocket Url 模式。")
                 await self._start_standalone_server()
@@ -276,12 +346,18 @@ class OneBotAdapter(IMAdapter, UserProfileAdapter, BotProfileAdapter):
                 for route in self.web_server.app.routes:
                     if self.config.websocket_url in route.path: # type: ignore
                         self.web_server.app.routes.remove(route)
-            # 6. 清理状态
+
+            # 5. 清理状态
             self.heartbeat_states.clear()
 
             self.logger.info("OneBot adapter stopped")
         except Exception as e:
             self.logger.error(f"Error stopping OneBot adapter: {e}")
+        finally:
+            # 6. 保存缓存快照并结束录制，前面的步骤出错也不影响
+            await self._save_snapshot()
+            if self._recorder:
+                await asyncio.to_thread(self._recorder.close)
 
     async def recall_message(self, message_id: int, delay: int = 0):
         """撤回消息
@@ -294,58 +370,16 @@ class OneBotAdapter(IMAdapter, UserProfileAdapter, BotProfileAdapter):
             await asyncio.sleep(delay)
         await self.bot.delete_msg(message_id=message_id)
 
+    def _typing_delay(self, text_length: int) -> float:
+        """模拟打字的发送延时(秒)"""
+        return max(text_length * 0.1, 1) + random.uniform(0.5, 1.5)
+
     async def send_message(self, message: IMMessage, recipient: ChatSender) -> MessageResult:
         """发送消息"""
         result = MessageResult()
         try:
             segments = await self.convert_to_message_segment(message)
-
-            buffer: list[MessageSegment] = []
-            text_length = 0
-
-            async def flush():
-                nonlocal text_length
-                if not buffer:
-                    return
-                # 计算延时
-                duration = max(text_length * 0.1, 1) + random.uniform(0.5, 1.5)
-                await asyncio.sleep(duration)
-
-                # 发送消息
-                if recipient.chat_type == ChatType.GROUP:
-                    assert recipient.group_id is not None
-                    send_result = await self.bot.send_group_msg(
-                        group_id=int(recipient.group_id),
-                        message=buffer
-                    )
-                else:
-                    send_result = await self.bot.send_private_msg(
-                        user_id=int(recipient.user_id),
-                        message=buffer
-                    )
-                result.message_id = send_result.get('message_id')
-                result.raw_results.append(
-                    {"action": "send", "result": send_result})
-
-                # 清空buffer和text_length
-                buffer.clear()
-                text_length = 0
-
-            for segment in segments:
-                # 判断是否需要flush
-                if segment.type in ("text", "record", "video", "rps", "dice", "shake", "poke", "share", "contact", "location"):
-                    await flush()
-                    buffer = [segment]
-                    if segment.type == "text":
-                        text_length = len(segment.data.get("text", ""))
-                else:
-                    buffer.append(segment)
-                    if segment.type == "text":
-                        text_length += len(segment.data.get("text", ""))
-
-            # 发送剩余的消息
-            await flush()
-
+            await self._send_segments(segments, recipient, result)
             return result
 
         except Exception as e:
@@ -353,6 +387,53 @@ class OneBotAdapter(IMAdapter, UserProfileAdapter, BotProfileAdapter):
             result.error = f"Error in send_message: {str(e)}"
             return result
 
+    async def _send_segments(self, segments: list[MessageSegment], recipient: ChatSender, result: MessageResult):
+        """按消息段类型分批发送已转换的消息段，发送结果写入 result"""
+        buffer: list[MessageSegment] = []
+        text_length = 0
+
+        async def flush():
+            nonlocal text_length
+            if not buffer:
+                return
+            # 计算延时
+            await asyncio.sleep(self._typing_delay(text_length))
+
+            # 发送消息
+            if recipient.chat_type == ChatType.GROUP:
+                assert recipient.group_id is not None
+                send_result = await self.bot.send_group_msg(
+                    group_id=int(recipient.group_id),
+                    message=buffer
+                )
+            else:
+                send_result = await self.bot.send_private_msg(
+                    user_id=int(recipient.user_id),
+                    message=buffer
+                )
+            result.message_id = send_result.get('message_id')
+            result.raw_results.append(
+                {"action": "send", "result": send_result})
+
+            # 清空buffer和text_length
+            buffer.clear()
+            text_length = 0
+
+        for segment in segments:
+            # 判断是否需要flush
+            if segment.type in ("text", "record", "video", "rps", "dice", "shake", "poke", "share", "contact", "location"):
+                await flush()
+                buffer = [segment]
+                if segment.type == "text":
+                    text_length = len(segment.data.get("text", ""))
+            else:
+                buffer.append(segment)
+                if segment.type == "text":
+                    text_length += len(segment.data.get("text", ""))
+
+        # 发送剩余的消息
+        await flush()
+
     async def mute_user(self, group_id: str, user_id: str, duration: int):
         """禁言用户"""
         await self.bot.set_group_ban(
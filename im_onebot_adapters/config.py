@@ -41,5 +41,22 @@ class OneBotConfig(BaseModel):
                         title="反向 Websocket 服务器端口",
                         description="服务监听端口（已过时，请使用 websocket_url 代替）",
                         json_schema_extra={"hidden_unset": True})
+
+    snapshot_dir: Optional[str] = Field(
+                        default="data/onebot",
+                        title="缓存快照目录",
+                        description="停止时保存用户资料缓存，重启后恢复，留空则不保存",
+                        json_schema_extra={"hidden_unset": True})
+
+    record_path: Optional[str] = Field(
+                        default=None,
+                        title="流量录制文件",
+                        description="将收到的事件和 API 调用结果录制为 JSONL 文件，用于离线回放，无论扩展名如何都以 gzip 压缩写入（建议使用 .jsonl.gz），留空则不录制",
+                        json_schema_extra={"hidden_unset": True})
+    record_redact: bool = Field(
+                        default=True,
+                        title="录制脱敏",
+                        description="录制时只保留事件类型、时间、消息 ID 等结构字段，QQ 号等整数替换为伪 ID，其余文本和资源链接替换为占位内容",
+                        json_schema_extra={"hidden_unset": True})
     
     model_config = ConfigDict(extra="allow")
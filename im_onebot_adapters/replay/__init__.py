@@ -0,0 +1,3 @@
+from .harness import ReplayAdapter, ReplayHarness, StageStats, StubActions, StubDispatcher, StubMediaManager, format_report
+
+__all__ = ['ReplayAdapter', 'ReplayHarness', 'StageStats', 'StubActions', 'StubDispatcher', 'StubMediaManager', 'format_report']
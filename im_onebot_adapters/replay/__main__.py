@@ -0,0 +1,29 @@
+import argparse
+import asyncio
+
+from .harness import ReplayHarness, format_report
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="python -m im_onebot_adapters.replay",
+        description="回放 OneBot 流量录制文件并统计各阶段吞吐量")
+    parser.add_argument("path", help="录制文件路径")
+    parser.add_argument("--speed", type=float, default=0,
+                        help="回放倍速，1 为原始速度，0 为不等待尽快回放(默认)")
+    parser.add_argument("--no-send", action="store_true", help="不回放发送流程")
+    parser.add_argument("--trace-alloc", action="store_true", help="使用 tracemalloc 统计内存分配")
+    args = parser.parse_args()
+
+    harness = ReplayHarness(
+        args.path,
+        speed=args.speed,
+        send=not args.no_send,
+        trace_allocations=args.trace_alloc
+    )
+    stats = asyncio.run(harness.run())
+    print(format_report(stats))
+
+
+if __name__ == "__main__":
+    main()
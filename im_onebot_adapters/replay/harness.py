@@ -0,0 +1,239 @@
+import asyncio
+import functools
+import hashlib
+import time
+import tracemalloc
+from collections import Counter, defaultdict, deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+from aiocqhttp import Event
+
+import kirara_ai.im.message as im_message
+from kirara_ai.im.message import IMMessage
+from kirara_ai.logger import get_logger
+from ..adapter import OneBotAdapter
+from ..config import OneBotConfig
+from ..utils.recorder import read_recording
+
+T = TypeVar("T")
+
+
+@dataclass
+class StageStats:
+    """单个处理阶段的统计"""
+    name: str
+    count: int = 0
+    seconds: float = 0.0
+    alloc_bytes: int = 0  # 各次调用峰值分配之和，未开启 tracemalloc 时为 0
+
+    @property
+    def throughput(self) -> float:
+        """每秒处理次数"""
+        return self.count / self.seconds if self.seconds else 0.0
+
+    @property
+    def alloc_per_call(self) -> float:
+        """平均每次调用的峰值分配(字节)"""
+        return self.alloc_bytes / self.count if self.count else 0.0
+
+
+class StubDispatcher:
+    """不执行工作流的调度器，可选地把收到的消息原样回发以覆盖发送流程"""
+
+    def __init__(self, reply: bool = False):
+        self.reply = reply
+        self.count = 0
+
+    async def dispatch(self, adapter, message: IMMessage):
+        self.count += 1
+        if self.reply and message.message_elements:
+            await adapter.send_message(message, message.sender)
+
+
+class StubMediaManager:
+    """
+    替代 kirara_ai MediaManager 的桩实现
+
+    根据资源地址生成 media_id，不下载资源也不写入 data/media
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._urls: Dict[str, Optional[str]] = {}
+
+    async def register_media(self, url: Optional[str] = None, path: Optional[str] = None,
+                             data: Optional[bytes] = None, **kwargs) -> str:
+        source = (url or path or "").encode() if data is None else data
+        media_id = hashlib.sha1(source).hexdigest()
+        self._urls[media_id] = url
+        return media_id
+
+    def get_metadata(self, media_id: str) -> None:
+        return None
+
+    async def get_url(self, media_id: str) -> Optional[str]:
+        return self._urls.get(media_id)
+
+
+class StubActions:
+    """
+    替代 OneBot API 的桩实现
+
+    按动作名循环返回录制中的结果，没有录制结果的动作返回默认值
+    """
+
+    def __init__(self, records: List[Dict[str, Any]]):
+        self._responses: Dict[str, Deque[Any]] = defaultdict(deque)
+        for record in records:
+            if record.get("kind") == "action" and not record.get("error"):
+                self._responses[record["action"]].append(record.get("response"))
+        self.calls: Counter = Counter()
+
+    async def call_action(self, action: str, **params) -> Any:
+        self.calls[action] += 1
+        responses = self._responses.get(action)
+        if responses:
+            response = responses[0]
+            responses.rotate(-1)
+            return response
+        if action.startswith("send_"):
+            return {"message_id": self.calls[action]}
+        return {}
+
+
+class ReplayAdapter(OneBotAdapter):
+    """去掉发送延时的适配器，用于回放"""
+
+    def _typing_delay(self, text_length: int) -> float:
+        return 0
+
+
+class ReplayHarness:
+    """
+    录制流量回放器
+
+    将录制的事件按原始节奏或加速后送入适配器的 `_handle_msg`，
+    统计每个阶段的吞吐量和内存分配。各阶段是嵌套的：
+
+    - handle: `_handle_msg`，包含 convert 和 dispatch
+    - convert: `convert_to_message`
+    - dispatch: 调度器，开启回发时包含 reply
+    - reply: `send_message`，包含 segment 和 send
+    - segment: `convert_to_message_segment`
+    - send: `_send_segments`
+
+    回放期间媒体消息段使用 `StubMediaManager` 注册，不产生网络和磁盘 IO
+    """
+
+    def __init__(self, path: str, speed: float = 0, send: bool = True, trace_allocations: bool = False):
+        """
+        Args:
+            path: 录制文件路径
+            speed: 回放倍速，1 为原始速度，0 为不等待尽快回放
+            send: 是否将转换后的消息再经由发送流程回发
+            trace_allocations: 是否使用 tracemalloc 统计内存分配，会明显降低吞吐
+        """
+        self.path = path
+        self.speed = speed
+        self.send = send
+        self.trace_allocations = trace_allocations
+        self.logger = get_logger("OneBot-Replay")
+        self.stats: Dict[str, StageStats] = {}
+        # 嵌套阶段的 (起始内存, 已观测到的峰值)，内层阶段重置峰值前先并入外层
+        self._alloc_stack: List[Tuple[int, int]] = []
+
+    async def _stage(self, name: str, awaitable: Awaitable[T]) -> T:
+        stats = self.stats.setdefault(name, StageStats(name))
+        if self.trace_allocations:
+            current, peak = tracemalloc.get_traced_memory()
+            if self._alloc_stack:
+                outer_base, outer_peak = self._alloc_stack[-1]
+                self._alloc_stack[-1] = (outer_base, max(outer_peak, peak))
+            tracemalloc.reset_peak()
+            self._alloc_stack.append((current, current))
+        start = time.perf_counter()
+        try:
+            return await awaitable
+        finally:
+            stats.seconds += time.perf_counter() - start
+            stats.count += 1
+            if self.trace_allocations:
+                base, observed_peak = self._alloc_stack.pop()
+                peak = max(observed_peak, tracemalloc.get_traced_memory()[1])
+                stats.alloc_bytes += max(peak - base, 0)
+                if self._alloc_stack:
+                    outer_base, outer_peak = self._alloc_stack[-1]
+                    self._alloc_stack[-1] = (outer_base, max(outer_peak, peak))
+
+    def _wrap(self, name: str, func: Callable[..., Awaitable[T]]) -> Callable[..., Awaitable[T]]:
+        """包装方法，使其每次调用都计入指定阶段"""
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs) -> T:
+            return await self._stage(name, func(*args, **kwargs))
+        return wrapper
+
+    async def run(self) -> Dict[str, StageStats]:
+        """执行一次完整回放，返回各阶段统计"""
+        records = list(read_recording(self.path, self.logger))
+        events = [r for r in records if r.get("kind") == "event"]
+
+        adapter = ReplayAdapter(OneBotConfig(snapshot_dir=None))
+        dispatcher = StubDispatcher(reply=self.send)
+        actions = StubActions(records)
+        adapter.dispatcher = dispatcher  # type: ignore
+        adapter.bot.call_action = actions.call_action  # type: ignore
+
+        # 在实例上包装各阶段方法，_handle_msg 和 send_message 内部的调用也会被计时
+        adapter.convert_to_message = self._wrap("convert", adapter.convert_to_message)  # type: ignore
+        dispatcher.dispatch = self._wrap("dispatch", dispatcher.dispatch)  # type: ignore
+        adapter.send_message = self._wrap("reply", adapter.send_message)  # type: ignore
+        adapter.convert_to_message_segment = self._wrap(  # type: ignore
+            "segment", adapter.convert_to_message_segment)
+        adapter._send_segments = self._wrap("send", adapter._send_segments)  # type: ignore
+
+        self.stats = {}
+        self._alloc_stack = []
+        media_manager = StubMediaManager()
+        original_media_manager = im_message.MediaManager
+        im_message.MediaManager = lambda: media_manager  # type: ignore
+        if self.trace_allocations:
+            tracemalloc.start()
+        try:
+            first_ts: Optional[float] = None
+            replay_start = time.perf_counter()
+            for record in events:
+                if self.speed > 0:
+                    if first_ts is None:
+                        first_ts = record["ts"]
+                    delay = (record["ts"] - first_ts) / self.speed - \
+                        (time.perf_counter() - replay_start)
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+
+                event = Event.from_payload(record["payload"])
+                if not event:
+                    continue
+                await self._replay_event(adapter, event)
+        finally:
+            im_message.MediaManager = original_media_manager  # type: ignore
+            if self.trace_allocations:
+                tracemalloc.stop()
+
+        return self.stats
+
+    async def _replay_event(self, adapter: ReplayAdapter, event: Event):
+        if event.type == 'meta_event':
+            await self._stage("meta", adapter._handle_meta(event))
+        elif event.type == 'notice':
+            await self._stage("notice", adapter.handle_notice(event))
+        elif event.type == 'message':
+            await self._stage("handle", adapter._handle_msg(event))
+
+
+def format_report(stats: Dict[str, StageStats]) -> str:
+    """将各阶段统计格式化为文本表格"""
+    lines = [f"{'stage':<10}{'count':>10}{'seconds':>12}{'ops/s':>12}{'alloc/op':>12}"]
+    for s in stats.values():
+        lines.append(
+            f"{s.name:<10}{s.count:>10}{s.seconds:>12.4f}{s.throughput:>12.1f}{s.alloc_per_call:>12.0f}")
+    return "\n".join(lines)
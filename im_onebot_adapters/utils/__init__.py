@@ -1,3 +1,5 @@
 from .message import create_message_element
+from .recorder import TrafficRecorder, read_recording
+from .snapshot import CacheSnapshot, load_snapshot, save_snapshot
 
-__all__ = ['create_message_element'] 
\ No newline at end of file
+__all__ = ['create_message_element', 'TrafficRecorder', 'read_recording', 'CacheSnapshot', 'load_snapshot', 'save_snapshot'] 
@@ -0,0 +1,334 @@
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import queue
+import threading
+import time
+import zlib
+from typing import Any, Awaitable, Callable, Dict, IO, Iterator, Optional, Tuple
+
+from aiocqhttp import Event
+
+# 事件和 API 结果中可以原样保留的结构字段，另外所有以 _type 结尾的字段也会保留
+# 其余字段一律脱敏：整数替换为伪 ID，字符串替换为等长文本，其余标量置空
+_SAFE_KEYS = {
+    'post_type', 'time', 'message_id', 'message_seq', 'real_id', 'font',
+    'role', 'sex', 'age', 'level', 'interval', 'duration', 'size', 'busid',
+    'status', 'retcode', 'join_time', 'last_sent_time', 'title_expire_time',
+}
+# 需要脱敏的 ID 字段，替换为稳定的伪 ID 以保留 at 机器人等关联关系
+_ID_KEYS = {'user_id', 'group_id', 'self_id', 'target_id', 'operator_id', 'qq', 'uin'}
+# 需要脱敏的资源字段
+_URL_KEYS = {'url', 'file', 'path', 'avatar', 'image', 'audio'}
+# 包含消息段列表的字段，content 为合并转发 node 中的消息
+_MESSAGE_KEYS = {'message', 'content'}
+
+# 各类型消息段中可以原样保留的字段，其余字符串字段替换为等长文本，其余非字符串字段置空
+_SEGMENT_SAFE_FIELDS = {
+    'face': {'id'},
+    'reply': {'id'},
+    'image': {'type', 'subType', 'sub_type', 'file_size'},
+    'record': {'magic', 'file_size'},
+    'video': {'file_size'},
+    'rps': {'result'},
+    'dice': {'result'},
+    'poke': {'type', 'id'},
+    'music': {'type', 'id'},
+    'forward': {'id'},
+    'contact': {'type'},
+}
+# 各类型消息段中需要替换为伪 ID 的字段
+_SEGMENT_ID_FIELDS = {
+    'contact': {'id'},
+    'node': {'id', 'uin'},
+}
+
+# 每写入这么多条记录或经过这么多秒就结束当前 gzip 成员，进程异常退出时最多丢失一批
+_BATCH_RECORDS = 100
+_BATCH_SECONDS = 5.0
+
+_GZIP_MAGIC = b"\x1f\x8b"
+# gzip 成员头(魔数 + deflate 压缩方法)，用于在损坏的批次后定位下一批
+_GZIP_HEADER = b"\x1f\x8b\x08"
+_READ_CHUNK = 1 << 16
+
+
+class TrafficRecorder:
+    """
+    OneBot 流量录制器
+
+    将收到的原始事件和 API 调用结果以 gzip 压缩的 JSONL 格式追加写入文件，
+    供 `im_onebot_adapters.replay` 离线回放。每批记录写成一个完整的 gzip 成员，
+    异常退出时已写完的批次仍可读取。
+
+    事件循环上只把记录放入队列，脱敏、序列化和压缩都在独立的写入线程中完成，
+    因此交给录制器的事件在之后不应再被修改
+    """
+
+    def __init__(self, path: str, _logger, redact: bool = True):
+        self.path = path
+        self._logger = _logger
+        self.redact = redact
+        # 每个录制器使用独立的盐值，避免伪 ID 被反查出原始 QQ 号
+        self._salt = os.urandom(16)
+        self._file: Optional[IO[str]] = None
+        self._batch_count = 0
+        self._batch_start = 0.0
+        self._queue: queue.SimpleQueue = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+
+    def _enqueue(self, build_record: Callable[[], Dict[str, Any]]):
+        """将记录的构造放入写入队列，写入线程按需启动"""
+        if self._writer is None or not self._writer.is_alive():
+            self._writer = threading.Thread(
+                target=self._run_writer, name="OneBot-Recorder", daemon=True)
+            self._writer.start()
+        self._queue.put(build_record)
+
+    def _run_writer(self):
+        """写入线程，空闲超过批次时间也会结束当前批次"""
+        while True:
+            timeout = None
+            if self._file is not None:
+                timeout = max(self._batch_start + _BATCH_SECONDS - time.time(), 0)
+            try:
+                build_record = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                self._close_batch()
+                continue
+
+            if build_record is None:
+                self._close_batch()
+                return
+            try:
+                self._write(build_record())
+            except Exception as e:
+                # 录制失败不应影响正常的事件处理
+                self._logger.warning(f"Failed to record traffic: {e}")
+
+    def _write(self, record: Dict[str, Any]):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = gzip.open(self.path, "at", encoding="utf-8")
+            self._batch_count = 0
+            self._batch_start = time.time()
+        self._file.write(json.dumps(record, ensure_ascii=False, default=str))
+        self._file.write("\n")
+
+        self._batch_count += 1
+        if (self._batch_count >= _BATCH_RECORDS or
+                time.time() - self._batch_start >= _BATCH_SECONDS):
+            self._close_batch()
+
+    def _close_batch(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _pseudo_id(self, value: Any) -> Any:
+        if value is None or value == 'all':
+            return value
+        digest = hashlib.sha1(self._salt + str(value).encode()).hexdigest()
+        pseudo = int(digest[:10], 16)
+        return pseudo if isinstance(value, int) else str(pseudo)
+
+    def _redact(self, obj: Any) -> Any:
+        """按白名单递归脱敏，只替换值，保留结构、类型和文本长度"""
+        if isinstance(obj, dict):
+            return {k: self._redact_field(k, v) for k, v in obj.items()}
+        if isinstance(obj, (list, tuple)):
+            return [self._redact(v) for v in obj]
+        return self._redact_value(obj)
+
+    def _redact_field(self, key: str, value: Any) -> Any:
+        if key in _MESSAGE_KEYS and isinstance(value, list):
+            return [self._redact_segment(seg) for seg in value]
+        if isinstance(value, (dict, list, tuple)):
+            return self._redact(value)
+        if key in _SAFE_KEYS or key.endswith('_type'):
+            return value
+        if key in _ID_KEYS and isinstance(value, (int, str)):
+            return self._pseudo_id(value)
+        if key in _URL_KEYS and isinstance(value, str) and value:
+            return self._redact_url(value)
+        return self._redact_value(value)
+
+    def _redact_value(self, value: Any) -> Any:
+        if isinstance(value, bool) or value is None:
+            return value
+        if isinstance(value, int):
+            # 未知的整数字段可能是 QQ 号或群号，统一替换为伪 ID
+            return self._pseudo_id(value)
+        if isinstance(value, str):
+            return "x" * len(value)
+        return None
+
+    def _redact_url(self, url: str) -> str:
+        digest = hashlib.sha1(self._salt + url.encode()).hexdigest()[:16]
+        return f"https://redacted.invalid/{digest}"
+
+    def _redact_segment(self, segment: Any) -> Any:
+        """按消息段类型的白名单脱敏 data 字段"""
+        if not (isinstance(segment, dict) and isinstance(segment.get('type'), str)
+                and isinstance(segment.get('data'), dict)):
+            return self._redact(segment)
+
+        seg_type = segment['type']
+        safe_fields = _SEGMENT_SAFE_FIELDS.get(seg_type, set())
+        id_fields = _SEGMENT_ID_FIELDS.get(seg_type, set())
+        data = {}
+        for k, v in segment['data'].items():
+            if k in safe_fields:
+                data[k] = v
+            elif (k in id_fields or k in _ID_KEYS) and isinstance(v, (int, str)):
+                data[k] = self._pseudo_id(v)
+            elif k in _MESSAGE_KEYS and isinstance(v, list):
+                data[k] = [self._redact_segment(seg) for seg in v]
+            elif k in _URL_KEYS and isinstance(v, str) and v:
+                data[k] = self._redact_url(v)
+            elif isinstance(v, str):
+                data[k] = "x" * len(v)
+            else:
+                data[k] = None
+        return {**segment, 'data': data}
+
+    def _prepare(self, obj: Any) -> Any:
+        # 先序列化再还原，得到与后续处理无关的快照，同时去掉 MessageSegment 等包装类型
+        data = json.loads(json.dumps(obj, ensure_ascii=False, default=str))
+        return self._redact(data) if self.redact else data
+
+    async def record_event(self, event: Event):
+        """记录一条原始事件，需在事件处理器修改事件之前调用"""
+        ts = time.time()
+        self._enqueue(lambda: {
+            "ts": ts,
+            "kind": "event",
+            "payload": self._prepare(dict(event))
+        })
+
+    def wrap_call_action(self, call_action: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        """包装 `CQHttp.call_action`，记录每次 API 调用的参数、结果和耗时"""
+        async def recording_call_action(action: str, **params) -> Any:
+            # 发送时的消息段列表在调用后会被清空复用，先复制一份
+            snapshot = {k: list(v) if isinstance(v, list) else v for k, v in params.items()}
+            start = time.time()
+            error: Optional[str] = None
+            response: Any = None
+            try:
+                response = await call_action(action, **params)
+                return response
+            except Exception as e:
+                error = f"{e.__class__.__name__}: {e}"
+                raise
+            finally:
+                elapsed = time.time() - start
+                self._enqueue(lambda: {
+                    "ts": start,
+                    "kind": "action",
+                    "action": action,
+                    "params": self._prepare(snapshot),
+                    "response": self._prepare(response),
+                    "error": error,
+                    "elapsed": elapsed
+                })
+
+        return recording_call_action
+
+    def close(self):
+        """
+        写完队列中剩余的记录并关闭录制文件，之后再次写入会以追加模式重新打开
+
+        会阻塞到写入线程退出，在事件循环中应通过 `asyncio.to_thread` 调用
+        """
+        if self._writer is not None and self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join()
+        self._writer = None
+
+
+def _decompress_member(data, start: int, end: int) -> Tuple[bytes, int, bool]:
+    """
+    解压从 start 开始的一个 gzip 成员，最多读取到 end
+
+    Returns:
+        (解压出的数据, 成员结束位置, 成员是否完整)
+    """
+    decompressor = zlib.decompressobj(wbits=31)
+    chunks = []
+    pos = start
+    try:
+        while not decompressor.eof and pos < end:
+            chunk = data[pos:min(pos + _READ_CHUNK, end)]
+            chunks.append(decompressor.decompress(chunk))
+            pos += len(chunk) - len(decompressor.unused_data)
+    except zlib.error:
+        pass
+    return b"".join(chunks), pos, decompressor.eof
+
+
+def _iter_gzip_members(data, path: str, _logger) -> Iterator[bytes]:
+    """
+    逐个解压 gzip 成员
+
+    进程异常退出会在文件中间留下截断的成员，重启后的录制器会继续在其后追加，
+    因此遇到损坏的成员时只保留其中完整的行，并跳到下一个成员头继续读取
+    """
+    size = len(data)
+    pos = 0
+    while pos < size:
+        start = pos
+        output, pos, complete = _decompress_member(data, start, size)
+        if complete:
+            yield output
+            continue
+
+        _logger.warning(
+            f"Recording {path} has a damaged batch at offset {start}, skipping to the next batch")
+        # 截断的成员后面紧跟着下一个成员，解压时会把后者的字节当作压缩数据产生乱码，
+        # 所以只解压到下一个成员头之前，得到的就是截断前数据的准确前缀
+        next_start = data.find(_GZIP_HEADER, start + 1)
+        end = size if next_start == -1 else next_start
+        output, _, _ = _decompress_member(data, start, end)
+        yield output[:output.rfind(b"\n") + 1]
+        if next_start == -1:
+            break
+        pos = next_start
+
+
+def read_recording(path: str, _logger) -> Iterator[Dict[str, Any]]:
+    """
+    逐条读取录制文件
+
+    被截断的批次只保留其中完整的行，之后追加的批次照常读取
+
+    Args:
+        path: 录制文件路径，按文件头识别 gzip 压缩或未压缩的 JSONL
+        _logger: loguru 日志记录器
+
+    Returns:
+        按写入顺序产出的记录字典
+    """
+    with open(path, "rb") as f:
+        compressed = f.read(2) == _GZIP_MAGIC
+        if compressed:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                for member in _iter_gzip_members(data, path, _logger):
+                    for line in member.splitlines():
+                        if not line.strip():
+                            continue
+                        try:
+                            yield json.loads(line)
+                        except ValueError as e:
+                            _logger.warning(f"Skipping corrupted record in {path}: {e}")
+            return
+
+    with open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                # 最后一行没有写完
+                break
+            line = line.strip()
+            if line:
+                yield json.loads(line)
@@ -0,0 +1,103 @@
+import os
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from kirara_ai.im.profile import UserProfile
+
+# 快照格式版本，结构变化时递增，旧版本快照会被直接丢弃
+SNAPSHOT_VERSION = 2
+
+
+@dataclass
+class CacheSnapshot:
+    """适配器缓存快照"""
+    self_id: Optional[int] = None
+    profiles: Dict[str, Tuple[UserProfile, float]] = field(default_factory=dict)
+
+
+def save_snapshot(path: str, snapshot: CacheSnapshot):
+    """
+    将缓存快照写入 SQLite 文件
+
+    先写入临时文件再替换，避免中途退出留下损坏的快照
+
+    Args:
+        path: 快照文件路径
+        snapshot: 要保存的快照
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.executescript(
+            """
+            CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+            CREATE TABLE profiles (cache_key TEXT PRIMARY KEY, data TEXT, cached_at REAL);
+            """
+        )
+        conn.executemany(
+            "INSERT INTO meta VALUES (?, ?)",
+            [
+                ("version", str(SNAPSHOT_VERSION)),
+                ("saved_at", str(time.time())),
+                ("self_id", "" if snapshot.self_id is None else str(snapshot.self_id)),
+            ]
+        )
+        conn.executemany(
+            "INSERT INTO profiles VALUES (?, ?, ?)",
+            [(key, profile.model_dump_json(), cached_at)
+             for key, (profile, cached_at) in snapshot.profiles.items()]
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+    os.replace(tmp_path, path)
+
+
+def load_snapshot(path: str, ttl: float, _logger) -> Optional[CacheSnapshot]:
+    """
+    从 SQLite 文件读取缓存快照
+
+    条目保留原始缓存时间，已过期的条目在读取时直接丢弃
+
+    Args:
+        path: 快照文件路径
+        ttl: 用户资料缓存过期时间(秒)
+        _logger: loguru 日志记录器
+
+    Returns:
+        CacheSnapshot实例 或 None(文件不存在、版本不匹配或已损坏)
+    """
+    if not os.path.exists(path):
+        return None
+
+    try:
+        conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+        try:
+            meta = dict(conn.execute("SELECT key, value FROM meta").fetchall())
+            if meta.get("version") != str(SNAPSHOT_VERSION):
+                _logger.warning(
+                    f"Ignoring cache snapshot {path} with version {meta.get('version')}")
+                return None
+
+            current_time = time.time()
+            snapshot = CacheSnapshot(
+                self_id=int(meta["self_id"]) if meta.get("self_id") else None
+            )
+            for key, data, cached_at in conn.execute(
+                    "SELECT cache_key, data, cached_at FROM profiles"):
+                if current_time - cached_at < ttl:
+                    snapshot.profiles[key] = (
+                        UserProfile.model_validate_json(data), cached_at)
+            return snapshot
+        finally:
+            conn.close()
+    except Exception as e:
+        _logger.warning(f"Failed to load cache snapshot {path}: {e}")
+        return None
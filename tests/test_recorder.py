@@ -0,0 +1,137 @@
+import asyncio
+import os
+import subprocess
+import sys
+import textwrap
+
+from aiocqhttp import Event
+from kirara_ai.logger import get_logger
+
+from im_onebot_adapters.utils.recorder import TrafficRecorder, read_recording
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+logger = get_logger("OneBot-Test")
+
+
+def make_event(i: int) -> Event:
+    return Event({
+        "post_type": "message",
+        "message_type": "group",
+        "sub_type": "normal",
+        "time": 1700000000 + i,
+        "self_id": 10001,
+        "user_id": 20002,
+        "group_id": 30003,
+        "message_id": i,
+        # 不易压缩的文本，保证未关闭的批次有部分数据已经落盘
+        "message": [{"type": "text", "data": {"text": os.urandom(512).hex()}}],
+    })
+
+
+def record(recorder: TrafficRecorder, start: int, count: int):
+    async def run():
+        for i in range(start, start + count):
+            await recorder.record_event(make_event(i))
+    asyncio.run(run())
+
+
+def test_read_recording_after_crash_keeps_later_batches(tmp_path):
+    path = str(tmp_path / "traffic.jsonl.gz")
+
+    # 子进程写入 190 条后直接退出，不关闭录制文件，留下一个截断的批次
+    script = textwrap.dedent(f"""
+        import os, sys, time
+        sys.path.insert(0, {ROOT!r})
+        sys.path.insert(0, {os.path.dirname(os.path.abspath(__file__))!r})
+        from test_recorder import TrafficRecorder, logger, record
+        recorder = TrafficRecorder({path!r}, logger, redact=False)
+        record(recorder, 0, 190)
+        # 等待写入线程取完队列，但不结束当前批次
+        while not recorder._queue.empty():
+            time.sleep(0.01)
+        time.sleep(0.2)
+        os._exit(0)
+    """)
+    subprocess.run([sys.executable, "-c", script], check=True)
+
+    recorder = TrafficRecorder(path, logger, redact=False)
+    record(recorder, 1000, 100)
+    recorder.close()
+
+    ids = [r["payload"]["message_id"] for r in read_recording(path, logger)]
+    assert ids[:100] == list(range(100))
+    assert ids[-100:] == list(range(1000, 1100))
+
+
+def test_read_recording_detects_gzip_without_suffix(tmp_path):
+    path = str(tmp_path / "traffic.jsonl")
+    recorder = TrafficRecorder(path, logger, redact=False)
+    record(recorder, 0, 3)
+    recorder.close()
+
+    ids = [r["payload"]["message_id"] for r in read_recording(path, logger)]
+    assert ids == [0, 1, 2]
+
+
+def test_close_drains_queued_records(tmp_path):
+    path = str(tmp_path / "traffic.jsonl.gz")
+    recorder = TrafficRecorder(path, logger, redact=False)
+    record(recorder, 0, 250)
+    recorder.close()
+    # 关闭后再次录制会重新启动写入线程并追加
+    record(recorder, 250, 5)
+    recorder.close()
+
+    ids = [r["payload"]["message_id"] for r in read_recording(path, logger)]
+    assert ids == list(range(255))
+
+
+def test_redact_uses_allowlist_for_events_and_responses(tmp_path):
+    recorder = TrafficRecorder(str(tmp_path / "traffic.jsonl.gz"), logger)
+
+    stranger = recorder._prepare({
+        "user_id": 123456789,
+        "uin": "123456789",
+        "qid": "someone",
+        "nickname": "Alice",
+        "long_nick": "hello world",
+        "sign": "my sign",
+        "email": "alice@example.com",
+        "phone_num": "13800000000",
+        "area": "Shanghai",
+        "sex": "female",
+        "age": 20,
+        "level": 3,
+    })
+    assert stranger["user_id"] != 123456789
+    assert stranger["uin"] == str(stranger["user_id"])
+    for key in ("qid", "nickname", "long_nick", "sign", "email", "phone_num", "area"):
+        assert stranger[key] == "x" * len(stranger[key])
+    assert (stranger["sex"], stranger["age"], stranger["level"]) == ("female", 20, 3)
+
+    notice = recorder._prepare({
+        "post_type": "notice",
+        "notice_type": "group_card",
+        "time": 1700000000,
+        "self_id": 10001,
+        "group_id": 30003,
+        "user_id": 20002,
+        "card_new": "new card",
+        "card_old": "old card",
+    })
+    assert notice["card_new"] == "xxxxxxxx"
+    assert notice["card_old"] == "xxxxxxxx"
+    assert (notice["post_type"], notice["notice_type"], notice["time"]) == (
+        "notice", "group_card", 1700000000)
+    assert notice["self_id"] != 10001
+
+
+def test_redact_keeps_bot_mentions_consistent(tmp_path):
+    recorder = TrafficRecorder(str(tmp_path / "traffic.jsonl.gz"), logger)
+
+    event = recorder._prepare(dict(make_event(0), message=[
+        {"type": "at", "data": {"qq": "10001"}},
+        {"type": "contact", "data": {"type": "qq", "id": "20002"}},
+    ]))
+    assert event["message"][0]["data"]["qq"] == str(event["self_id"])
+    assert event["message"][1]["data"]["id"] == str(event["user_id"])
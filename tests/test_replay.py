@@ -0,0 +1,47 @@
+import asyncio
+
+from aiocqhttp import Event
+
+from im_onebot_adapters.replay import ReplayHarness, StubActions
+from im_onebot_adapters.utils.recorder import TrafficRecorder
+
+from test_recorder import logger
+
+
+def test_replay_runs_handle_msg_and_nested_stages(tmp_path, monkeypatch):
+    path = str(tmp_path / "traffic.jsonl.gz")
+    recorder = TrafficRecorder(path, logger)
+
+    async def record():
+        for i in range(3):
+            await recorder.record_event(Event({
+                "post_type": "message",
+                "message_type": "group",
+                "sub_type": "normal",
+                "time": 1700000000 + i,
+                "self_id": 10001,
+                "user_id": 20002,
+                "group_id": 30003,
+                "message_id": i,
+                "message": [
+                    {"type": "at", "data": {"qq": "10001"}},
+                    {"type": "text", "data": {"text": "look"}},
+                    {"type": "image", "data": {"file": "a.jpg", "url": "https://example.com/a.jpg"}},
+                ],
+            }))
+    asyncio.run(record())
+    recorder.close()
+
+    sent = []
+    call_action = StubActions.call_action
+
+    async def spy(self, action, **params):
+        sent.append([segment.type for segment in params["message"]])
+        return await call_action(self, action, **params)
+    monkeypatch.setattr(StubActions, "call_action", spy)
+
+    stats = asyncio.run(ReplayHarness(path).run())
+
+    assert list(stats) == ["handle", "convert", "dispatch", "reply", "segment", "send"]
+    assert all(s.count == 3 for s in stats.values())
+    assert ["text", "image"] in sent